@@ -9,6 +9,7 @@ use crate::intensity::{prosit_intensities_to_fragments, FragmentIntensityPredict
 use zstd::stream::encode_all; // For compression
 use bincode::{Encode, Decode};
 use zstd::decode_all;
+use rayon::prelude::*;
 
 #[derive(Debug, Clone, Serialize, Deserialize, Encode, Decode)]
 pub struct Psm {
@@ -247,13 +248,172 @@ pub fn compress_psms(psms: &[Psm]) -> io::Result<Vec<u8>> {
 
 pub fn decompress_psms(compressed_data: &[u8]) -> io::Result<Vec<Psm>> {
     // Step 1: Decompress the data using ZSTD
-    let decompressed = decode_all(compressed_data).expect("Decompression failed");
+    let decompressed = decode_all(compressed_data)?;
     // Step 2: Configure bincode
     let config = standard();
     // Step 3: Deserialize the decompressed data back into Psm structs
     let psms: Vec<Psm> = bincode::decode_from_slice(&decompressed, config)
-        .expect("Deserialization failed")
+        .map_err(|e| io::Error::new(io::ErrorKind::InvalidData, e.to_string()))?
         .0;
     // Step 4: Return the deserialized data
     Ok(psms)
-}
\ No newline at end of file
+}
+
+/// Compresses psms in independent shards in parallel, the output starts with the number of shards
+/// followed by each shard as its byte length and the zstd compressed data, all lengths are u64 little endian
+pub fn compress_psms_par(psms: &[Psm], num_shards: usize) -> io::Result<Vec<u8>> {
+    let num_shards = num_shards.max(1);
+    let chunk_size = ((psms.len() + num_shards - 1) / num_shards).max(1);
+
+    let shards: Vec<Vec<u8>> = psms
+        .par_chunks(chunk_size)
+        .map(compress_psms)
+        .collect::<io::Result<Vec<_>>>()?;
+
+    let total_size = 8 + shards.iter().map(|shard| 8 + shard.len()).sum::<usize>();
+    let mut framed = Vec::with_capacity(total_size);
+    framed.extend_from_slice(&(shards.len() as u64).to_le_bytes());
+    for shard in &shards {
+        framed.extend_from_slice(&(shard.len() as u64).to_le_bytes());
+        framed.extend_from_slice(shard);
+    }
+
+    Ok(framed)
+}
+
+/// Decompresses the output of `compress_psms_par`, shards are decompressed in parallel and keep their order
+pub fn decompress_psms_par(framed_data: &[u8]) -> io::Result<Vec<Psm>> {
+    let truncated = || io::Error::new(io::ErrorKind::UnexpectedEof, "Truncated PSM shard data");
+    let read_u64 = |offset: usize| -> io::Result<u64> {
+        let bytes = framed_data.get(offset..offset + 8).ok_or_else(truncated)?;
+        Ok(u64::from_le_bytes(bytes.try_into().unwrap()))
+    };
+
+    let num_shards = read_u64(0)? as usize;
+    // the shard count comes from the data, every shard needs at least its 8 byte length prefix
+    let mut shards: Vec<&[u8]> = Vec::with_capacity(num_shards.min(framed_data.len() / 8));
+    let mut offset = 8;
+
+    for _ in 0..num_shards {
+        let shard_size = read_u64(offset)? as usize;
+        offset += 8;
+        let end = offset.checked_add(shard_size).ok_or_else(truncated)?;
+        let shard = framed_data.get(offset..end).ok_or_else(truncated)?;
+        shards.push(shard);
+        offset = end;
+    }
+
+    let decoded: Vec<Vec<Psm>> = shards
+        .par_iter()
+        .map(|shard| decompress_psms(shard))
+        .collect::<io::Result<Vec<_>>>()?;
+
+    Ok(decoded.into_iter().flatten().collect())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use sage_core::database::PeptideIx;
+
+    fn setup_psm(idx: u32) -> Psm {
+        let feature = Feature {
+            peptide_idx: PeptideIx(idx),
+            psm_id: idx as usize,
+            peptide_len: 7,
+            spec_id: format!("spec_{}", idx),
+            file_id: 0,
+            rank: 1,
+            label: 1,
+            expmass: 800.0,
+            calcmass: 800.0,
+            charge: 2,
+            rt: 0.0,
+            aligned_rt: 0.0,
+            predicted_rt: 0.0,
+            delta_rt_model: 0.0,
+            ims: 0.0,
+            predicted_ims: 0.0,
+            delta_ims_model: 0.0,
+            delta_mass: 0.0,
+            isotope_error: 0.0,
+            average_ppm: 0.0,
+            hyperscore: idx as f64,
+            delta_next: 0.0,
+            delta_best: 0.0,
+            matched_peaks: 0,
+            longest_b: 0,
+            longest_y: 0,
+            longest_y_pct: 0.0,
+            missed_cleavages: 0,
+            matched_intensity_pct: 0.0,
+            scored_candidates: 0,
+            poisson: 0.0,
+            discriminant_score: 0.0,
+            posterior_error: 0.0,
+            spectrum_q: 0.0,
+            peptide_q: 0.0,
+            protein_q: 0.0,
+            ms2_intensity: 0.0,
+            fragments: None,
+        };
+
+        Psm::new(
+            format!("spec_{}", idx), idx, vec![format!("protein_{}", idx)], feature,
+            None, None, None, None, None, None, None, None, None, None, Some(idx as f64),
+        )
+    }
+
+    fn round_trip(num_psms: u32, num_shards: usize) {
+        let psms: Vec<Psm> = (0..num_psms).map(setup_psm).collect();
+        let framed = compress_psms_par(&psms, num_shards).unwrap();
+        let restored = decompress_psms_par(&framed).unwrap();
+
+        assert_eq!(restored.len(), psms.len(), "Number of decompressed PSMs is incorrect.");
+        for (expected, actual) in psms.iter().zip(restored.iter()) {
+            assert_eq!(actual.spec_idx, expected.spec_idx, "PSM order or content changed in round trip.");
+            assert_eq!(actual.peptide_idx, expected.peptide_idx);
+            assert_eq!(actual.proteins, expected.proteins);
+            assert_eq!(actual.re_score, expected.re_score);
+        }
+    }
+
+    #[test]
+    fn test_compress_par_round_trip_empty() {
+        round_trip(0, 4);
+    }
+
+    #[test]
+    fn test_compress_par_round_trip_single() {
+        round_trip(1, 4);
+    }
+
+    #[test]
+    fn test_compress_par_round_trip_more_psms_than_shards() {
+        round_trip(10, 3);
+    }
+
+    #[test]
+    fn test_decompress_par_truncated() {
+        let psms: Vec<Psm> = (0..5).map(setup_psm).collect();
+        let framed = compress_psms_par(&psms, 2).unwrap();
+
+        for end in [0, 3, 8, 12, framed.len() - 1] {
+            let err = decompress_psms_par(&framed[..end]).unwrap_err();
+            assert_eq!(err.kind(), io::ErrorKind::UnexpectedEof, "Truncated data at {} bytes not detected.", end);
+        }
+    }
+
+    #[test]
+    fn test_decompress_par_corrupt_header() {
+        // a huge shard count or shard size must be reported as truncated data, not allocate or overflow
+        let mut framed = u64::MAX.to_le_bytes().to_vec();
+        let err = decompress_psms_par(&framed).unwrap_err();
+        assert_eq!(err.kind(), io::ErrorKind::UnexpectedEof);
+
+        framed = 1u64.to_le_bytes().to_vec();
+        framed.extend_from_slice(&u64::MAX.to_le_bytes());
+        let err = decompress_psms_par(&framed).unwrap_err();
+        assert_eq!(err.kind(), io::ErrorKind::UnexpectedEof);
+    }
+}
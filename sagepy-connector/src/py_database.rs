@@ -484,14 +484,18 @@ impl PyParameters {
         Ok(digest.into_iter().map(|t| PyPeptide { inner: t }).collect())
     }
 
-    pub fn build_indexed_database(&self) -> PyResult<PyIndexedDatabase> {
-        Ok(PyIndexedDatabase {
-            inner: self.inner.clone().build(Fasta::parse(
-                self.inner.fasta.clone(),
-                self.inner.decoy_tag.clone(),
-                self.inner.generate_decoys,
-            )),
-        })
+    pub fn build_indexed_database(&self, py: Python<'_>) -> PyResult<PyIndexedDatabase> {
+        let parameters = self.inner.clone();
+        // parsing and indexing do not touch python objects, other threads may run meanwhile
+        let inner = py.allow_threads(|| {
+            let fasta = Fasta::parse(
+                parameters.fasta.clone(),
+                parameters.decoy_tag.clone(),
+                parameters.generate_decoys,
+            );
+            parameters.build(fasta)
+        });
+        Ok(PyIndexedDatabase { inner })
     }
 
     #[getter]
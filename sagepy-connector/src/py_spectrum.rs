@@ -1,5 +1,7 @@
 use numpy::{IntoPyArray, PyArray1, PyArrayMethods};
 use pyo3::prelude::*;
+use rayon::prelude::*;
+use rayon::ThreadPoolBuilder;
 
 use crate::py_mass::PyTolerance;
 use sage_core::spectrum::{
@@ -348,12 +350,36 @@ impl PySpectrumProcessor {
         self.inner.deisotope
     }
 
-    pub fn process(&self, spectrum: &PyRawSpectrum) -> PyProcessedSpectrum {
+    pub fn process(&self, py: Python<'_>, spectrum: &PyRawSpectrum) -> PyProcessedSpectrum {
+        let raw_spectrum = spectrum.inner.clone();
+        // processing does not touch any python objects, allow other threads to run meanwhile
+        let processed = py.allow_threads(|| self.inner.process(raw_spectrum));
         PyProcessedSpectrum {
-            inner: self.inner.process(spectrum.inner.clone()),
+            inner: processed,
             collision_energies: spectrum.collision_energies.clone(),
         }
     }
+
+    pub fn process_batch(&self, py: Python<'_>, spectra: Vec<PyRef<'_, PyRawSpectrum>>, num_threads: usize) -> Vec<PyProcessedSpectrum> {
+        let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
+
+        // borrow the spectra instead of extracting owned copies of the whole batch up front,
+        // the shared borrows are taken with the GIL held and keep the spectra unchanged meanwhile
+        let raw_spectra: Vec<&PyRawSpectrum> = spectra.iter().map(|spectrum| &**spectrum).collect();
+
+        // spectra are independent, each one is copied right before it is processed so that
+        // only the spectra currently in flight exist twice, all without holding the GIL
+        py.allow_threads(|| {
+            thread_pool.install(|| {
+                raw_spectra.par_iter().map(|spectrum| {
+                    PyProcessedSpectrum {
+                        inner: self.inner.process(spectrum.inner.clone()),
+                        collision_energies: spectrum.collision_energies.clone(),
+                    }
+                }).collect()
+            })
+        })
+    }
 }
 
 #[pyclass]
@@ -476,6 +502,36 @@ impl PyPrecursor {
     }
 }
 
+/// Calibrates the peak m/z values of a batch of processed spectra in place
+///
+/// Only the peaks are shifted, the precursors are left as they are. Every spectrum is borrowed
+/// mutably for the whole call, so passing the same spectrum twice fails with "Already borrowed".
+///
+/// # Arguments
+///
+/// * `spectra` - the processed spectra to calibrate
+/// * `ppm` - the ppm error to subtract
+/// * `num_threads` - the number of threads to use
+///
+#[pyfunction]
+pub fn calibrate_mz_ppm_batch(
+    py: Python<'_>,
+    mut spectra: Vec<PyRefMut<'_, PyProcessedSpectrum>>,
+    ppm: f32,
+    num_threads: usize,
+) {
+    let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
+
+    // the mutable borrows are held for the whole batch, so the spectra can be updated without the GIL
+    let mut inner: Vec<&mut PyProcessedSpectrum> = spectra.iter_mut().map(|spectrum| &mut **spectrum).collect();
+
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            inner.par_iter_mut().for_each(|spectrum| spectrum.calibrate_mz_ppm(ppm));
+        })
+    });
+}
+
 #[pymodule]
 pub fn py_spectrum(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<PyPeak>()?;
@@ -485,5 +541,6 @@ pub fn py_spectrum(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<PyRepresentation>()?;
     m.add_class::<PyRawSpectrum>()?;
     m.add_class::<PyProcessedSpectrum>()?;
+    m.add_function(wrap_pyfunction!(calibrate_mz_ppm_batch, m)?)?;
     Ok(())
 }
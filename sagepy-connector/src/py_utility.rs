@@ -1,6 +1,8 @@
+use numpy::{IntoPyArray, PyArray2, PyArrayMethods};
 use pyo3::prelude::*;
+use pyo3::exceptions::PyValueError;
 use std::collections::{BTreeMap, HashMap, HashSet};
-use qfdrust::psm::{compress_psms, decompress_psms, Psm};
+use qfdrust::psm::{compress_psms, compress_psms_par, decompress_psms, decompress_psms_par, Psm};
 use rayon::prelude::*;
 use rayon::ThreadPoolBuilder;
 use sage_core::ion_series::Kind;
@@ -174,90 +176,194 @@ pub fn sage_sequence_to_unimod(sequence: String, modifications: Vec<f32>, expect
 }
 
 #[pyfunction]
-pub fn psms_to_feature_matrix(psms: Vec<PyPsm>, num_threads: usize) -> Vec<Vec<f64>> {
+pub fn psms_to_feature_matrix(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> PyResult<Py<PyArray2<f64>>> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
-            psm.inner.get_feature_vector()
-        }
-        ).collect()
-    })
+    let rows: Vec<Vec<f64>> = py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                psm.inner.get_feature_vector()
+            }
+            ).collect()
+        })
+    });
+
+    // hand out a single typed 2D array instead of nested python lists of floats
+    let num_rows = rows.len();
+    let num_cols = rows.first().map_or(0, |row| row.len());
+    let flat: Vec<f64> = rows.into_iter().flatten().collect();
+
+    let np_array: Py<PyArray2<f64>> = flat
+        .into_pyarray(py)
+        .reshape([num_rows, num_cols])?
+        .unbind();
+
+    Ok(np_array)
 }
 
 #[pyfunction]
-pub fn get_psm_sequences_par(psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
+pub fn get_psm_sequences_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
-            psm.inner.sequence.clone().unwrap().sequence
-        }).collect()
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                psm.inner.sequence.clone().unwrap().sequence
+            }).collect()
+        })
     })
 }
 
 #[pyfunction]
-pub fn get_psm_sequences_modified_par(psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
+pub fn get_psm_sequences_modified_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
-            psm.inner.sequence_modified.clone().unwrap().sequence
-        }).collect()
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                psm.inner.sequence_modified.clone().unwrap().sequence
+            }).collect()
+        })
     })
 }
 
 #[pyfunction]
-pub fn get_psm_sequences_decoy_par(psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
+pub fn get_psm_sequences_decoy_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
-            psm.inner.sequence_decoy.clone().unwrap().sequence
-        }).collect()
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                psm.inner.sequence_decoy.clone().unwrap().sequence
+            }).collect()
+        })
     })
 }
 
 #[pyfunction]
-pub fn get_psm_sequences_decoy_modified_par(psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
+pub fn get_psm_sequences_decoy_modified_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
 
-            let sequence = match &psm.inner.sequence_decoy_modified {
-                Some(seq) => seq.sequence.clone(),
-                None => "".to_string(),
-            };
+                let sequence = match &psm.inner.sequence_decoy_modified {
+                    Some(seq) => seq.sequence.clone(),
+                    None => "".to_string(),
+                };
 
-            sequence
+                sequence
 
-        }).collect()
+            }).collect()
+        })
     })
 }
 
 #[pyfunction]
-pub fn get_psm_spec_idx_par(psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
+pub fn get_psm_spec_idx_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> Vec<String> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
-            psm.inner.spec_idx.clone()
-        }).collect()
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                psm.inner.spec_idx.clone()
+            }).collect()
+        })
     })
 }
 
 #[pyfunction]
-pub fn get_psm_proteins_par(psms: Vec<PyPsm>, num_threads: usize) -> Vec<Vec<String>> {
+pub fn get_psm_proteins_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> Vec<Vec<String>> {
     let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
 
-    thread_pool.install(|| {
-        psms.par_iter().map(|psm| {
-            psm.inner.proteins.clone()
-        }).collect()
+    py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                psm.inner.proteins.clone()
+            }).collect()
+        })
     })
 }
 
+/// Collects the feature matrix and all per-psm string columns in a single parallel pass
+///
+/// # Arguments
+///
+/// * `psms` - the peptide spectrum matches
+/// * `num_threads` - the number of threads to use
+///
+/// # Returns
+///
+/// * a tuple of (feature matrix, sequence, sequence_modified, sequence_decoy,
+///   sequence_decoy_modified, spec_idx, proteins, feature names)
+///
+#[pyfunction]
+pub fn psms_to_full_record(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> PyResult<(
+    Py<PyArray2<f64>>,
+    Vec<String>,
+    Vec<String>,
+    Vec<String>,
+    Vec<String>,
+    Vec<String>,
+    Vec<Vec<String>>,
+    Vec<String>,
+)> {
+    let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
+
+    let records: Vec<(Vec<f64>, String, String, String, String, String, Vec<String>)> = py.allow_threads(|| {
+        thread_pool.install(|| {
+            psms.par_iter().map(|psm| {
+                let sequence_decoy_modified = match &psm.inner.sequence_decoy_modified {
+                    Some(seq) => seq.sequence.clone(),
+                    None => "".to_string(),
+                };
+
+                (
+                    psm.inner.get_feature_vector(),
+                    psm.inner.sequence.clone().unwrap().sequence,
+                    psm.inner.sequence_modified.clone().unwrap().sequence,
+                    psm.inner.sequence_decoy.clone().unwrap().sequence,
+                    sequence_decoy_modified,
+                    psm.inner.spec_idx.clone(),
+                    psm.inner.proteins.clone(),
+                )
+            }).collect()
+        })
+    });
+
+    let num_rows = records.len();
+    let num_cols = records.first().map_or(0, |record| record.0.len());
+    let names: Vec<String> = psms.first().map_or(Vec::new(), |psm| {
+        psm.inner.get_feature_names().into_iter().map(|name| name.to_string()).collect()
+    });
+
+    let mut flat: Vec<f64> = Vec::with_capacity(num_rows * num_cols);
+    let mut sequence = Vec::with_capacity(num_rows);
+    let mut sequence_modified = Vec::with_capacity(num_rows);
+    let mut sequence_decoy = Vec::with_capacity(num_rows);
+    let mut sequence_decoy_modified = Vec::with_capacity(num_rows);
+    let mut spec_idx = Vec::with_capacity(num_rows);
+    let mut proteins = Vec::with_capacity(num_rows);
+
+    for (features, seq, seq_mod, seq_decoy, seq_decoy_mod, idx, prot) in records {
+        flat.extend(features);
+        sequence.push(seq);
+        sequence_modified.push(seq_mod);
+        sequence_decoy.push(seq_decoy);
+        sequence_decoy_modified.push(seq_decoy_mod);
+        spec_idx.push(idx);
+        proteins.push(prot);
+    }
+
+    let np_array: Py<PyArray2<f64>> = flat
+        .into_pyarray(py)
+        .reshape([num_rows, num_cols])?
+        .unbind();
+
+    Ok((np_array, sequence, sequence_modified, sequence_decoy, sequence_decoy_modified, spec_idx, proteins, names))
+}
+
 #[pyfunction]
 pub fn py_compress_psms(psms: Vec<PyPsm>) -> Vec<u8> {
     let inner_psms = psms.iter().map(|psm| psm.inner.clone()).collect::<Vec<_>>();
@@ -265,11 +371,35 @@ pub fn py_compress_psms(psms: Vec<PyPsm>) -> Vec<u8> {
 }
 
 #[pyfunction]
-pub fn py_decompress_psms(psms_bin: Vec<u8>) -> Vec<PyPsm> {
-    let inner_psms: Vec<Psm> = decompress_psms(&psms_bin.as_slice()).unwrap();
-    inner_psms.iter().map(|psm| PyPsm {
+pub fn py_decompress_psms(psms_bin: Vec<u8>) -> PyResult<Vec<PyPsm>> {
+    let inner_psms: Vec<Psm> = decompress_psms(&psms_bin.as_slice())
+        .map_err(|e| PyValueError::new_err(format!("Failed to decompress PSMs: {}", e)))?;
+    Ok(inner_psms.iter().map(|psm| PyPsm {
         inner: psm.clone(),
-    }).collect()
+    }).collect())
+}
+
+#[pyfunction]
+pub fn py_compress_psms_par(py: Python<'_>, psms: Vec<PyPsm>, num_threads: usize) -> PyResult<Vec<u8>> {
+    let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
+
+    py.allow_threads(|| {
+        let inner_psms = psms.iter().map(|psm| psm.inner.clone()).collect::<Vec<_>>();
+        thread_pool.install(|| compress_psms_par(&inner_psms, num_threads))
+    }).map_err(|e| PyValueError::new_err(format!("Failed to compress PSMs: {}", e)))
+}
+
+#[pyfunction]
+pub fn py_decompress_psms_par(py: Python<'_>, psms_bin: Vec<u8>, num_threads: usize) -> PyResult<Vec<PyPsm>> {
+    let thread_pool = ThreadPoolBuilder::new().num_threads(num_threads).build().unwrap();
+
+    let inner_psms: Vec<Psm> = py.allow_threads(|| {
+        thread_pool.install(|| decompress_psms_par(psms_bin.as_slice()))
+    }).map_err(|e| PyValueError::new_err(format!("Failed to decompress PSMs: {}", e)))?;
+
+    Ok(inner_psms.into_iter().map(|psm| PyPsm {
+        inner: psm,
+    }).collect())
 }
 
 #[pymodule]
@@ -288,7 +418,10 @@ pub fn py_utility(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(get_psm_sequences_decoy_modified_par, m)?)?;
     m.add_function(wrap_pyfunction!(get_psm_spec_idx_par, m)?)?;
     m.add_function(wrap_pyfunction!(get_psm_proteins_par, m)?)?;
+    m.add_function(wrap_pyfunction!(psms_to_full_record, m)?)?;
     m.add_function(wrap_pyfunction!(py_compress_psms, m)?)?;
     m.add_function(wrap_pyfunction!(py_decompress_psms, m)?)?;
+    m.add_function(wrap_pyfunction!(py_compress_psms_par, m)?)?;
+    m.add_function(wrap_pyfunction!(py_decompress_psms_par, m)?)?;
     Ok(())
 }
\ No newline at end of file
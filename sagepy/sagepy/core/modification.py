@@ -138,8 +138,8 @@ def validate_var_mods(mods: Dict[str, List[float]]) -> Dict[ModificationSpecific
 
 
 if __name__ == "__main__":
-    static_mods = {k: v for k, v in [SAGE_KNOWN_MODS.cysteine_static()]}
-    variable_mods = {k: v for k, v in [SAGE_KNOWN_MODS.methionine_variable()]}
+    static_mods = dict([SAGE_KNOWN_MODS.cysteine_static()])
+    variable_mods = dict([SAGE_KNOWN_MODS.methionine_variable()])
 
     static = validate_mods(static_mods)
     variab = validate_var_mods(variable_mods)
@@ -7,6 +7,27 @@ from sagepy.core.enzyme import Position, Digest
 
 psc = sagepy_connector.py_peptide
 
+# TODO: find a better way to do the map-back
+_UNIMOD_BY_ROUNDED_MASS = {
+    42: '[UNIMOD:1]',
+    57: '[UNIMOD:4]',
+    80: '[UNIMOD:21]',
+    16: '[UNIMOD:35]',
+    119: '[UNIMOD:312]',
+}
+
+# the same map as a list indexed by the rounded mass, a bounds check and list index replace the hash lookup
+_MOD_TABLE = [_UNIMOD_BY_ROUNDED_MASS.get(key) for key in range(128)]
+
+
+def _rounded_mass_to_mod(maybe_key: int) -> str:
+    # try to translate to UNIMOD annotation
+    mod = _MOD_TABLE[maybe_key] if 0 <= maybe_key < len(_MOD_TABLE) else None
+    if mod is None:
+        raise KeyError(f"Rounded mass not in dict: {maybe_key}")
+    return mod
+
+
 def mass_to_mod(mass: float) -> str:
     """ Convert a mass to a UNIMOD modification annotation.
 
@@ -16,20 +37,8 @@ def mass_to_mod(mass: float) -> str:
     Returns:
         a UNIMOD modification annotation
     """
-    maybe_key = int(np.round(mass))
-    # TODO: find a better way to do the map-back
-    mod_dict = {
-        42: '[UNIMOD:1]',
-        57: '[UNIMOD:4]',
-        80: '[UNIMOD:21]',
-        16: '[UNIMOD:35]',
-        119: '[UNIMOD:312]',
-    }
-    # try to translate to UNIMOD annotation
-    try:
-        return mod_dict[maybe_key]
-    except KeyError:
-        raise KeyError(f"Rounded mass not in dict: {maybe_key}")
+    # python's round matches np.round (half to even) and returns an int without a ufunc call
+    return _rounded_mass_to_mod(round(mass))
 
 
 class Peptide:
@@ -156,19 +165,20 @@ class Peptide:
         mods = self.modifications
         sequence = self.sequence
 
-        seq = ''
+        # round all modification masses in one call instead of once per residue
+        rounded = np.round(np.asarray(mods, dtype=np.float64)).astype(np.int64).tolist()
+
+        tokens = []
 
-        for i, (s, m) in enumerate(zip(sequence, mods)):
+        for i, (s, m, key) in enumerate(zip(sequence, mods, rounded)):
             if m != 0:
+                mod = _rounded_mass_to_mod(key)
                 # TODO: check if this is the correct way to handle N- and C-terminal mods
-                if i == 0:
-                    if mass_to_mod(m) == '[UNIMOD:1]':
-                        seq += f'{mass_to_mod(m)}{s}'
-                    else:
-                        seq += f'{s}{mass_to_mod(m)}'
+                if i == 0 and mod == '[UNIMOD:1]':
+                    tokens.append(f'{mod}{s}')
                 else:
-                    seq += f'{s}{mass_to_mod(m)}'
+                    tokens.append(f'{s}{mod}')
             else:
-                seq += s
+                tokens.append(s)
 
-        return seq
+        return ''.join(tokens)
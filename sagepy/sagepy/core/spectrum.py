@@ -312,10 +312,12 @@ class RawSpectrum:
             ion_injection_time (float, optional): The ion injection time of the spectrum. Defaults to 0.0.
             ms_level (int, optional): The ms level of the spectrum. Defaults to 2.
         """
+        # the connector expects contiguous float32 peaks, only copy if the arrays are not already in that layout
         self.__raw_spectrum_ptr = psc.PyRawSpectrum(file_id, ms_level, spec_id, [p.get_py_ptr() for p in precursors],
                                                     representation.get_py_ptr(),
                                                     scan_start_time, ion_injection_time, total_ion_current,
-                                                    mz, intensity)
+                                                    np.ascontiguousarray(mz, dtype=np.float32),
+                                                    np.ascontiguousarray(intensity, dtype=np.float32))
     @classmethod
     def from_py_raw_spectrum(cls, raw_spectrum: psc.PyRawSpectrum):
         instance = cls.__new__(cls)
@@ -413,3 +415,24 @@ class SpectrumProcessor:
 
     def process(self, raw_spectrum: RawSpectrum) -> ProcessedSpectrum:
         return ProcessedSpectrum.from_py_processed_spectrum(self.__spectrum_processor_ptr.process(raw_spectrum.get_py_ptr()))
+
+    def process_batch(self, raw_spectra: List[RawSpectrum], num_threads: int = 4) -> List[ProcessedSpectrum]:
+        processed = self.__spectrum_processor_ptr.process_batch([s.get_py_ptr() for s in raw_spectra], num_threads)
+        return [ProcessedSpectrum.from_py_processed_spectrum(p) for p in processed]
+
+
+def calibrate_mz_ppm_batch(spectra: List[ProcessedSpectrum], ppm: float, num_threads: int = 4):
+    """Calibrate the peak m/z values of a batch of processed spectra in place
+
+    Only the peaks are shifted, unlike ProcessedSpectrum.calibrate_mz_ppm the precursors are not touched.
+    All spectra are borrowed at once, so every entry must be a distinct spectrum.
+
+    Args:
+        spectra (List[ProcessedSpectrum]): The processed spectra, without duplicates
+        ppm (float): The ppm error to subtract
+        num_threads (int, optional): The number of threads to use. Defaults to 4.
+    """
+    ptrs = [spectrum.get_py_ptr() for spectrum in spectra]
+    if len({id(ptr) for ptr in ptrs}) != len(ptrs):
+        raise ValueError("calibrate_mz_ppm_batch requires distinct spectra, the same spectrum was passed more than once")
+    psc.calibrate_mz_ppm_batch(ptrs, ppm, num_threads)
@@ -76,28 +76,28 @@ def get_features(
         "intensity_ms1",
         "intensity_ms2",
         "collision_energy",
-        "cosine_similarity",
         "spectral_angle_similarity",
         "pearson_correlation",
         "spearman_correlation",
         "spectral_entropy_similarity",
     ]
-    ds = ds.copy()
+    # select and cast the feature columns once, the input frame is left untouched
+    X = ds[features].to_numpy(dtype=np.float32, copy=True)
 
-    # Log-transform the intensity columns
-    ds["intensity_ms1"] = ds["intensity_ms1"].apply(lambda x: np.log1p(x))
-    ds["intensity_ms2"] = ds["intensity_ms2"].apply(lambda x: np.log1p(x))
+    # Log-transform the intensity columns in place
+    for name in ("intensity_ms1", "intensity_ms2"):
+        i = features.index(name)
+        np.log1p(X[:, i], out=X[:, i])
 
     # avoid none values for cosine similarity
-    ds["cosine_similarity"] = ds["cosine_similarity"].apply(lambda x: 0.0 if x is None else x)
-
-    X = ds[features].to_numpy().astype(np.float32)
+    i = features.index("cosine_similarity")
+    np.nan_to_num(X[:, i], copy=False, nan=0.0)
 
     if replace_nan:
-        X = np.nan_to_num(X)
+        np.nan_to_num(X, copy=False)
 
-    Y = ds["decoy"].to_numpy()
-    Y = np.array([0 if x else 1 for x in Y]).astype(np.float32)
+    # targets are labeled 1, decoys 0
+    Y = (~ds["decoy"].to_numpy(dtype=bool)).astype(np.float32)
 
     return X, Y
 
@@ -241,7 +241,7 @@ def transform_psm_to_mokapot_pin(psm_df, seq_modified: bool = False):
     df_pin_clean = df_pin.dropna(axis=1, how='all')
     df_pin_clean = df_pin_clean.dropna()
 
-    df_pin_clean['Label'] = df_pin_clean['Label'].apply(lambda x: -1 if x else 1)
+    df_pin_clean['Label'] = np.where(df_pin_clean['Label'].to_numpy(dtype=bool), -1, 1)
     df_pin_clean['ScanNr'] = range(1, len(df_pin_clean) + 1)
 
     return df_pin_clean
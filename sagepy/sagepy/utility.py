@@ -1,14 +1,19 @@
 from typing import Dict, Tuple, List, Optional, Union
 
 import re
+import functools
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from numba import jit
+from numba import jit, prange
 import numpy as np
 import pandas as pd
 from numpy.typing import NDArray
 
 from sagepy.core.scoring import Psm
-from sagepy.core.spectrum import ProcessedSpectrum, RawSpectrum, Precursor, SpectrumProcessor, Representation
+from sagepy.core.spectrum import ProcessedSpectrum, RawSpectrum, Precursor, SpectrumProcessor, Representation, \
+    calibrate_mz_ppm_batch
 from sagepy.core.mass import Tolerance
 from sagepy.core.database import IndexedDatabase, EnzymeBuilder, SageSearchConfiguration
 from sagepy.qfdr.tdc import target_decoy_competition_pandas
@@ -20,27 +25,54 @@ psc = sagepy_connector.py_utility
 from typing import Iterator
 
 
-@jit(nopython=True)
+def _flatten_psm_collection(psm_collection: Union[List[Psm], Dict[str, List[Psm]]]) -> List[Psm]:
+    # chain.from_iterable concatenates the per-spectrum candidate lists at C level
+    if isinstance(psm_collection, dict):
+        return list(itertools.chain.from_iterable(psm_collection.values()))
+    return psm_collection
+
+
+def _psm_ptrs(psm_collection: Union[List[Psm], Dict[str, List[Psm]]]) -> List:
+    return [psm.get_py_ptr() for psm in _flatten_psm_collection(psm_collection)]
+
+
 def calculate_ppm_error(measured_value, reference_value):
     ppm_error = ((measured_value - reference_value) / reference_value) * 1_000_000
     return ppm_error
 
 
-@jit(nopython=True)
-def calculate_ppms(measured_values, reference_values):
-    n = len(measured_values)
-    ppm_errors = np.empty(n, dtype=np.float64)
-    for i in range(n):
-        ppm_errors[i] = calculate_ppm_error(measured_values[i], reference_values[i])
-    return ppm_errors
+# below this many values the numpy expression is faster than starting the parallel kernel
+_PARALLEL_PPM_THRESHOLD = 10_000
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def _ppms_par(measured_values, reference_values, out):
+    for i in prange(measured_values.shape[0]):
+        out[i] = ((measured_values[i] - reference_values[i]) / reference_values[i]) * 1_000_000.0
+
+
+def calculate_ppms(measured_values, reference_values) -> NDArray:
+    measured_values = np.ascontiguousarray(measured_values, dtype=np.float64)
+    reference_values = np.ascontiguousarray(reference_values, dtype=np.float64)
+
+    # large flat arrays are split across all cores
+    if (measured_values.ndim == 1 and measured_values.shape == reference_values.shape
+            and measured_values.shape[0] > _PARALLEL_PPM_THRESHOLD):
+        ppms = np.empty_like(measured_values)
+        _ppms_par(measured_values, reference_values, ppms)
+        return ppms
+
+    # one output buffer, the division and scaling are applied in place
+    ppms = np.subtract(measured_values, reference_values)
+    ppms /= reference_values
+    ppms *= 1_000_000.0
+    return ppms
 
 
-@jit(nopython=True)
 def mean_ppm(mz_observed, mz_calculated) -> float:
     return np.mean(calculate_ppms(mz_observed, mz_calculated))
 
 
-@jit(nopython=True)
 def median_ppm(mz_observed, mz_calculated) -> float:
     return np.median(calculate_ppms(mz_observed, mz_calculated))
 
@@ -97,24 +129,24 @@ def get_features(ds: pd.DataFrame, score: Optional[str] = None) -> (NDArray, NDA
         "intensity_ms1",
         "intensity_ms2",
         "collision_energy",
-        "cosine_similarity",
         "spectral_angle_similarity",
         "pearson_correlation",
         "spearman_correlation",
         "spectral_entropy_similarity",
     ]
-    ds = ds.copy()
+    # select, cast and fill missing values in one pass, the input frame is left untouched
+    X = ds[features].to_numpy(dtype=np.float32, na_value=0.0, copy=True)
 
-    ds["intensity_ms1"] = ds["intensity_ms1"].apply(lambda x: np.log(x + 1))
-    ds["intensity_ms2"] = ds["intensity_ms2"].apply(lambda x: np.log(x + 1))
+    # log-transform the intensity columns in place
+    for name in ("intensity_ms1", "intensity_ms2"):
+        i = features.index(name)
+        np.log1p(X[:, i], out=X[:, i])
 
-    X = ds[features].to_numpy().astype(np.float32)
+    # make sure that there are no NaN or infinite values, also those produced by the log-transform
+    np.nan_to_num(X, copy=False)
 
-    # make sure that there are no NaN values
-    X = np.nan_to_num(X, nan=0.0)
-
-    Y = ds["decoy"].to_numpy()
-    Y = np.array([0 if x else 1 for x in Y]).astype(np.float32)
+    # targets are labeled 1, decoys 0
+    Y = (~ds["decoy"].to_numpy(dtype=bool)).astype(np.float32)
 
     return X, Y
 
@@ -133,28 +165,51 @@ def apply_mz_calibration(psm, fragments: pd.DataFrame, use_median: bool = True,
         float: The ppm error
     """
 
-    psms = []
-    for _, item in psm.items():
-        psms.extend(item)
-
-    P = psm_collection_to_pandas(psms)
+    # psm_collection_to_pandas flattens the dict itself
+    P = psm_collection_to_pandas(psm)
     TDC = target_decoy_competition_pandas(P, method="psm", score="hyperscore")
     TDC = TDC[TDC.q_value <= target_q]
 
-    B = pd.merge(P, TDC, on=["spec_idx", "match_idx"])
+    # the join only filters P, so mask it by key membership instead of materializing the merged frame
+    keys = ["spec_idx", "match_idx"]
+    selected = pd.MultiIndex.from_frame(P[keys]).isin(pd.MultiIndex.from_frame(TDC[keys]))
 
-    ppm_error = 0.0
+    # aggregate on the raw array, ignoring matches without a mass error
+    delta_mass = P["delta_mass"].to_numpy(dtype=np.float64)[selected]
 
     if use_median:
-        ppm_error = np.median(B.delta_mass)
+        ppm_error = float(np.nanmedian(delta_mass))
     else:
-        ppm_error = np.mean(B.delta_mass)
+        ppm_error = float(np.nanmean(delta_mass))
 
-    fragments.apply(lambda row: row.processed_spec.calibrate_mz_ppm(ppm_error), axis=1)
+    # calibration happens in place, the whole column is handed to the connector in one call,
+    # a column that repeats a spectrum is calibrated row by row since the batch needs distinct spectra
+    spectra = fragments["processed_spec"].tolist()
+    if len({id(spectrum.get_py_ptr()) for spectrum in spectra}) == len(spectra):
+        calibrate_mz_ppm_batch(spectra, ppm_error)
+    else:
+        for spectrum in spectra:
+            spectrum.calibrate_mz_ppm(ppm_error)
 
     return ppm_error
 
 
+# all queries are centroided, the representation carries no per-spectrum state and can be shared
+_CENTROID_REPRESENTATION = Representation()
+
+# default spectrum processing settings, shared by create_query and the mzML readers
+_DEFAULT_TAKE_TOP_N_PEAKS = 150
+_DEFAULT_MIN_FRAGMENT_MZ = 100
+_DEFAULT_MAX_FRAGMENT_MZ = 2000
+
+
+@functools.lru_cache(maxsize=16)
+def _get_spectrum_processor(take_top_n_peaks: int, min_fragment_mz: float, max_fragment_mz: float) -> SpectrumProcessor:
+    # SpectrumProcessor only holds its configuration and keeps no per-spectrum state,
+    # so one instance can be shared by all queries built with the same settings
+    return SpectrumProcessor(take_top_n_peaks, min_fragment_mz, max_fragment_mz)
+
+
 def create_query(
         precursor_mz: float,
         precursor_charge: Optional[int],
@@ -171,9 +226,9 @@ def create_query(
         isolation_window_in_dalton: bool = True,
         file_id: int = 0,
         ms_level: int = 2,
-        take_top_n_peaks: int = 150,
-        min_fragment_mz: float = 100,
-        max_fragment_mz: float = 2000,
+        take_top_n_peaks: int = _DEFAULT_TAKE_TOP_N_PEAKS,
+        min_fragment_mz: float = _DEFAULT_MIN_FRAGMENT_MZ,
+        max_fragment_mz: float = _DEFAULT_MAX_FRAGMENT_MZ,
 ) -> ProcessedSpectrum:
     """Create a query spectrum
 
@@ -202,7 +257,50 @@ def create_query(
     """
 
     # configure the spectrum processor
-    spec_processor = SpectrumProcessor(take_top_n_peaks, min_fragment_mz, max_fragment_mz)
+    spec_processor = _get_spectrum_processor(take_top_n_peaks, min_fragment_mz, max_fragment_mz)
+
+    spec = _create_raw_query(
+        precursor_mz=precursor_mz,
+        precursor_charge=precursor_charge,
+        precursor_intensity=precursor_intensity,
+        isolation_window_lower=isolation_window_lower,
+        isolation_window_upper=isolation_window_upper,
+        collision_energy=collision_energy,
+        retention_time=retention_time,
+        ion_injection_time=ion_injection_time,
+        total_ion_current=total_ion_current,
+        fragment_mz=fragment_mz,
+        fragment_intensity=fragment_intensity,
+        spec_id=spec_id,
+        isolation_window_in_dalton=isolation_window_in_dalton,
+        file_id=file_id,
+        ms_level=ms_level,
+    )
+
+    # process the spectrum
+    processed_spec = spec_processor.process(spec)
+
+    return processed_spec
+
+
+def _create_raw_query(
+        precursor_mz: float,
+        precursor_charge: Optional[int],
+        precursor_intensity: float,
+        isolation_window_lower: float,
+        isolation_window_upper: float,
+        collision_energy: float,
+        retention_time: float,
+        ion_injection_time: float,
+        total_ion_current: float,
+        fragment_mz: NDArray,
+        fragment_intensity: NDArray,
+        spec_id: str,
+        isolation_window_in_dalton: bool = True,
+        file_id: int = 0,
+        ms_level: int = 2,
+) -> RawSpectrum:
+    # builds the unprocessed query, split from create_query so that spectra can be processed in batches
 
     # set selection window bounds
     if isolation_window_in_dalton:
@@ -224,19 +322,17 @@ def create_query(
         file_id=file_id,
         ms_level=ms_level,
         spec_id=spec_id,
-        representation=Representation(),
+        representation=_CENTROID_REPRESENTATION,
         precursors=[sage_precursor],
         scan_start_time=retention_time,
         ion_injection_time=ion_injection_time,
         total_ion_current=total_ion_current,
-        mz=fragment_mz.astype(np.float32),
-        intensity=fragment_intensity.astype(np.float32)
+        # RawSpectrum only copies the peaks if they are not already contiguous float32
+        mz=fragment_mz,
+        intensity=fragment_intensity,
     )
 
-    # process the spectrum
-    processed_spec = spec_processor.process(spec)
-
-    return processed_spec
+    return spec
 
 def create_sage_database(
     fasta_path: str,
@@ -299,37 +395,80 @@ def create_sage_database(
     return indexed_db
 
 
-def extract_mzml_data(file_path: str) -> pd.DataFrame:
+# convert each scalar column once to a fixed dtype instead of letting pandas infer it from python objects,
+# precursor m/z keeps double precision, spec_id and processed_spec stay object columns
+_MZML_COLUMN_DTYPES = {
+    "precursor_mz": np.float64,
+    "precursor_charge": np.int16,
+    "precursor_intensity": np.float32,
+    "retention_time": np.float32,
+    "injection_time": np.float32,
+    "collision_energy": np.float32,
+    "total_ion_current": np.float32,
+}
+
+
+def _mzml_batch_to_pandas(columns: Dict[str, list], raw_spectra: List[RawSpectrum], num_threads: int) -> pd.DataFrame:
+    # process all spectra in parallel on the rust side, results keep the reading order
+    # positional like create_query, so both share one cached processor
+    spec_processor = _get_spectrum_processor(
+        _DEFAULT_TAKE_TOP_N_PEAKS, _DEFAULT_MIN_FRAGMENT_MZ, _DEFAULT_MAX_FRAGMENT_MZ
+    )
+    columns["processed_spec"] = spec_processor.process_batch(raw_spectra, num_threads=num_threads)
+
+    for name, dtype in _MZML_COLUMN_DTYPES.items():
+        columns[name] = np.array(columns[name], dtype=dtype)
+
+    # Convert the typed columns to a pandas DataFrame
+    return pd.DataFrame(columns, copy=False)
+
+
+def extract_mzml_data_batches(file_path: str, batch_size: Optional[int] = 5000,
+                              num_threads: int = 4) -> Iterator[pd.DataFrame]:
     """
-    Extract relevant data from an mzML file
+    Extract relevant data from an mzML file in batches of MS2 spectra
     Args:
         file_path: Path to the mzML file
+        batch_size: Number of MS2 spectra per batch, None reads the whole file into a single batch,
+            which holds the raw peaks of every MS2 spectrum in memory at once
+        num_threads: Number of threads used to process the MS2 spectra
 
-    Returns:
-        pd.DataFrame: A pandas DataFrame with the extracted data
+    Yields:
+        pd.DataFrame: A pandas DataFrame with the extracted data of each batch
 
     """
-    d = []
-
-    with mzml.read(file_path) as reader:
+    # accumulate one list per column instead of one dict per spectrum
+    columns = {name: [] for name in ["spec_id", *_MZML_COLUMN_DTYPES, "processed_spec"]}
+    raw_spectra = []
+    num_batches = 0
+
+    # a single sequential pass does not need the offset index, and the peak arrays are
+    # decoded straight to the float32 layout the spectrum processor expects
+    with mzml.MzML(
+            file_path,
+            use_index=False,
+            dtype={'m/z array': np.float32, 'intensity array': np.float32},
+    ) as reader:
         for i, spectrum in enumerate(reader):
             # Check if the spectrum is an MS2 (DDA data usually has MS2 spectra)
             if spectrum['ms level'] == 2:
-                precursor = spectrum['precursorList']['precursor'][0]['selectedIonList']['selectedIon'][0]
+                precursor_entry = spectrum['precursorList']['precursor'][0]
+                precursor = precursor_entry['selectedIonList']['selectedIon'][0]
+
+                scan = spectrum['scanList']['scan'][0]
 
                 spec_id = spectrum['id']
                 total_ion_current = spectrum['total ion current']
-                retention_time = spectrum['scanList']['scan'][0]['scan start time']
-                injection_time = spectrum['scanList']['scan'][0]['ion injection time']
-                collision_energy = spectrum['precursorList']['precursor'][0]['activation']['collision energy']
+                retention_time = scan['scan start time']
+                injection_time = scan['ion injection time']
+                collision_energy = precursor_entry['activation']['collision energy']
 
                 # Extract the relevant metadata
-                isolation_window = spectrum['precursorList']['precursor'][0]['isolationWindow']
+                isolation_window = precursor_entry['isolationWindow']
+                isolation_mz = isolation_window['isolation window target m/z']
 
-                lower = isolation_window['isolation window target m/z'] - isolation_window[
-                    'isolation window lower offset']
-                upper = isolation_window['isolation window target m/z'] + isolation_window[
-                    'isolation window upper offset']
+                lower = isolation_mz - isolation_window['isolation window lower offset']
+                upper = isolation_mz + isolation_window['isolation window upper offset']
 
                 precursor_mz = precursor['selected ion m/z']
                 precursor_charge = precursor['charge state']
@@ -339,7 +478,8 @@ def extract_mzml_data(file_path: str) -> pd.DataFrame:
                 fragment_mz = spectrum['m/z array']
                 fragment_intensity = spectrum['intensity array']
 
-                processed_spec = create_query(
+                # reading stays sequential, spectrum processing is deferred to one call per batch
+                raw_spectra.append(_create_raw_query(
                     precursor_mz=precursor_mz,
                     precursor_charge=precursor_charge,
                     precursor_intensity=precursor_intensity,
@@ -352,27 +492,46 @@ def extract_mzml_data(file_path: str) -> pd.DataFrame:
                     fragment_mz=fragment_mz,
                     fragment_intensity=fragment_intensity,
                     spec_id=spec_id,
-                )
-
-                # Create a row dictionary with relevant data
-                row = {
-                    "spec_id": spec_id,
-                    "precursor_mz": precursor_mz,
-                    "precursor_charge": precursor_charge,
-                    "precursor_intensity": precursor_intensity,
-                    "retention_time": retention_time,
-                    "injection_time": injection_time,
-                    "collision_energy": collision_energy,
-                    "total_ion_current": total_ion_current,
-                    "processed_spec": processed_spec
-                }
-
-                # Append the row to the list
-                d.append(row)
-
-    # Convert the list of dictionaries to a pandas DataFrame
-    exp_data = pd.DataFrame(d)
-    return exp_data
+                ))
+
+                columns["spec_id"].append(spec_id)
+                columns["precursor_mz"].append(precursor_mz)
+                columns["precursor_charge"].append(precursor_charge)
+                columns["precursor_intensity"].append(precursor_intensity)
+                columns["retention_time"].append(retention_time)
+                columns["injection_time"].append(injection_time)
+                columns["collision_energy"].append(collision_energy)
+                columns["total_ion_current"].append(total_ion_current)
+
+                # hand out full batches right away, only one batch of raw spectra is held at a time
+                if batch_size is not None and len(raw_spectra) >= batch_size:
+                    yield _mzml_batch_to_pandas(columns, raw_spectra, num_threads)
+                    num_batches += 1
+                    columns = {name: [] for name in columns}
+                    raw_spectra = []
+
+    # the remaining spectra, or an empty frame if the file holds no MS2 spectra at all
+    if raw_spectra or num_batches == 0:
+        yield _mzml_batch_to_pandas(columns, raw_spectra, num_threads)
+
+
+def extract_mzml_data(file_path: str, num_threads: int = 4, batch_size: int = 5000) -> pd.DataFrame:
+    """
+    Extract relevant data from an mzML file
+    Args:
+        file_path: Path to the mzML file
+        num_threads: Number of threads used to process the MS2 spectra
+        batch_size: Number of MS2 spectra whose raw peaks are held in memory before they are processed
+
+    Returns:
+        pd.DataFrame: A pandas DataFrame with the extracted data
+
+    """
+    # only processed spectra are kept across batches, raw peaks never exceed one batch
+    return pd.concat(
+        extract_mzml_data_batches(file_path, batch_size=batch_size, num_threads=num_threads),
+        ignore_index=True,
+    )
 
 def psm_collection_to_feature_matrix(psm_collection: Union[List[Psm], Dict[str, List[Psm]]], num_threads: int = 4) -> NDArray:
     """Convert a list of peptide spectrum matches to a dictionary
@@ -385,16 +544,7 @@ def psm_collection_to_feature_matrix(psm_collection: Union[List[Psm], Dict[str,
         Dict[str, List[Psm]]: The dictionary of peptide spectrum matches
     """
 
-    psms = []
-
-    if isinstance(psm_collection, dict):
-        for _, psm_candidates in psm_collection.items():
-            psms.extend(psm_candidates)
-
-    else:
-        psms = psm_collection
-
-    return np.array(psc.psms_to_feature_matrix([psm.get_py_ptr() for psm in psms], num_threads))
+    return psc.psms_to_feature_matrix(_psm_ptrs(psm_collection), num_threads)
 
 # get_psm_sequences_par
 
@@ -409,16 +559,7 @@ def get_psm_sequences(psm_collection: Union[List[Psm], Dict[str, List[Psm]]], nu
         List[str]: The list of peptide sequences
     """
 
-    psms = []
-
-    if isinstance(psm_collection, dict):
-        for _, psm_candidates in psm_collection.items():
-            psms.extend(psm_candidates)
-
-    else:
-        psms = psm_collection
-
-    return psc.get_psm_sequences_par([psm.get_py_ptr() for psm in psms], num_threads)
+    return psc.get_psm_sequences_par(_psm_ptrs(psm_collection), num_threads)
 
 def get_spec_idx(psm_collection: Union[List[Psm], Dict[str, List[Psm]]], num_threads: int = 4) -> List[str]:
     """Get the spectrum indices from a list of peptide spectrum matches
@@ -431,68 +572,68 @@ def get_spec_idx(psm_collection: Union[List[Psm], Dict[str, List[Psm]]], num_thr
         List[str]: The list of spectrum indices
     """
 
-    psms = []
+    return psc.get_psm_spec_idx_par(_psm_ptrs(psm_collection), num_threads)
 
-    if isinstance(psm_collection, dict):
-        for _, psm_candidates in psm_collection.items():
-            psms.extend(psm_candidates)
 
-    else:
-        psms = psm_collection
+def _psm_ptrs_to_pandas(ptrs: List, num_threads: int) -> pd.DataFrame:
+    # extract the numeric features, peptide sequences, spectrum indices and feature names in one pass
+    (D, sequence, sequence_modified, sequence_decoy, sequence_decoy_modified,
+     spec_idx, proteins, names) = psc.psms_to_full_record(ptrs, num_threads=num_threads)
+
+    # collect all columns first, the sequence and spectrum index columns go in front
+    columns = {
+        "spec_idx": spec_idx,
+        "match_idx": sequence,
+        "match_identity_candidates": proteins,
+        "sequence": sequence,
+        "sequence_modified": sequence_modified,
+        "sequence_decoy": sequence_decoy,
+        "sequence_decoy_modified": sequence_decoy_modified,
+        "proteins": proteins,
+    }
+
+    for i, name in enumerate(names):
+        columns[name] = D[:, i]
 
-    return psc.get_psm_spec_idx_par([psm.get_py_ptr() for psm in psms], num_threads)
+    # convert the decoy column to boolean
+    columns["decoy"] = np.asarray(columns["decoy"]) == -1
+
+    # create the pandas dataframe in one go instead of inserting column by column,
+    # the feature columns are views into the typed matrix and need not be copied
+    return pd.DataFrame(columns, copy=False)
 
 
 def psm_collection_to_pandas(psm_collection: Union[List[Psm], Dict[str, List[Psm]]],
-                             num_threads: int = 4) -> pd.DataFrame:
+                             num_threads: int = 4,
+                             chunk_size: Optional[int] = 100_000) -> pd.DataFrame:
     """Convert a list of peptide spectrum matches to a pandas dataframe
 
     Args:
         psm_collection (Union[List[Psm], Dict[str, List[Psm]]): The peptide spectrum matches
         num_threads (int, optional): The number of threads to use. Defaults to 4.
+        chunk_size (Optional[int], optional): The number of matches converted at a time, must be positive,
+            None converts all at once. Defaults to 100_000.
 
     Returns:
         pd.DataFrame: The pandas dataframe
     """
 
-    psms = []
-
-    if isinstance(psm_collection, dict):
-        for _, item in psm_collection.items():
-            psms.extend(item)
-
-    else:
-        psms = psm_collection
+    if chunk_size is not None and chunk_size <= 0:
+        raise ValueError(f"chunk_size must be a positive integer or None, got {chunk_size}")
 
-    # extract the numeric features
-    D = psc.psms_to_feature_matrix([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
+    ptrs = _psm_ptrs(psm_collection)
 
-    # extract the peptide sequences and spectrum indices
-    sequence = psc.get_psm_sequences_par([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
-    sequence_modified = psc.get_psm_sequences_modified_par([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
-    sequence_decoy = psc.get_psm_sequences_decoy_par([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
-    sequence_decoy_modified = psc.get_psm_sequences_decoy_modified_par([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
-    spec_idx = psc.get_psm_spec_idx_par([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
-    proteins = psc.get_psm_proteins_par([psm.get_py_ptr() for psm in psms], num_threads=num_threads)
+    if chunk_size is None or len(ptrs) <= chunk_size:
+        return _psm_ptrs_to_pandas(ptrs, num_threads)
 
-    # get the feature names
-    names = psms[0].get_feature_names()
+    # the intermediate python lists of each chunk are released before the next chunk is extracted,
+    # the chunk frames themselves stay alive until the concatenated frame has been built
+    parts = [
+        _psm_ptrs_to_pandas(ptrs[start:start + chunk_size], num_threads)
+        for start in range(0, len(ptrs), chunk_size)
+    ]
 
-    # create the pandas dataframe
-    PSM_pandas = pd.DataFrame(D, columns=names)
-
-    # convert the decoy column to boolean
-    PSM_pandas["decoy"] = [True if d == -1 else False for d in PSM_pandas.decoy]
-
-    # add the sequence and spectrum index columns
-    PSM_pandas.insert(0, "spec_idx", spec_idx)
-    PSM_pandas.insert(1, "match_idx", sequence)
-    PSM_pandas.insert(2,"match_identity_candidates", proteins)
-    PSM_pandas.insert(3, "sequence", sequence)
-    PSM_pandas.insert(4, "sequence_modified", sequence_modified)
-    PSM_pandas.insert(5, "sequence_decoy", sequence_decoy)
-    PSM_pandas.insert(6, "sequence_decoy_modified", sequence_decoy_modified)
-    PSM_pandas.insert(7, "proteins", proteins)
+    PSM_pandas = pd.concat(parts, ignore_index=True)
 
     return PSM_pandas
 
@@ -510,18 +651,24 @@ def split_fasta(fasta: str, num_splits: int = 16, randomize: bool = True, verbos
     if num_splits == 1:
         return [fasta]
 
-    split_strings = re.split(r'\n>', fasta)
+    # every entry keeps its leading '>', so that entries can be sliced straight out of the input
+    if not fasta.startswith('>'):
+        fasta = '>' + fasta
+
+    # (start, stop) offsets of the entries, stop excludes the newline in front of the next '>'
+    separators = np.fromiter((m.start() for m in re.finditer(r'\n>', fasta)), dtype=np.int64)
+    starts = np.concatenate(([0], separators + 1))
+    stops = np.concatenate((separators, [len(fasta)]))
 
     if verbose:
-        print(f"Total number of sequences: {len(split_strings)} ...")
+        print(f"Total number of sequences: {len(starts)} ...")
 
+    # shuffle a permutation of the offsets, the entry text itself is never moved
     if randomize:
-        np.random.shuffle(split_strings)
+        order = np.random.permutation(len(starts))
+        starts, stops = starts[order], stops[order]
 
-    if not split_strings[0].startswith('>'):
-        split_strings[0] = '>' + split_strings[0]
-
-    total_items = len(split_strings)
+    total_items = len(starts)
     items_per_batch = total_items // num_splits
     remainder = total_items % num_splits
 
@@ -535,10 +682,12 @@ def split_fasta(fasta: str, num_splits: int = 16, randomize: bool = True, verbos
         if start_index >= total_items:
             break
 
-        batch = '\n>'.join(split_strings[start_index:stop_index])
-
-        if not batch.startswith('>'):
-            batch = '>' + batch
+        if randomize:
+            batch = '\n'.join(fasta[start:stop] for start, stop in
+                              zip(starts[start_index:stop_index].tolist(), stops[start_index:stop_index].tolist()))
+        else:
+            # consecutive entries form one contiguous region of the input
+            batch = fasta[int(starts[start_index]):int(stops[stop_index - 1])]
 
         fastas.append(batch)
         start_index = stop_index
@@ -559,6 +708,7 @@ def generate_search_configurations(
     bucket_size: int = 2**14,
     generate_decoys: bool = True,
     randomize_split: bool = True,
+    num_threads: int = 1,
 ) -> Iterator[SageSearchConfiguration]:
     """
     Generates an iterator of indexed databases for each split of a FASTA file.
@@ -577,6 +727,7 @@ def generate_search_configurations(
         bucket_size (int): Size of the bucket for indexing. Default is 2^14.
         generate_decoys (bool): Whether to generate decoys in the database. Default is True.
         randomize_split (bool): Whether to randomize the order of sequences before splitting. Default is True.
+        num_threads (int): Number of splits indexed concurrently, also bounds how many databases are held in memory. Default is 1.
 
     Yields:
         SageSearchConfiguration: Indexed database configuration for each split.
@@ -598,8 +749,7 @@ def generate_search_configurations(
         c_terminal=c_terminal,
     )
 
-    # Generate configurations for each split
-    for fasta in fastas:
+    def build_indexed_database(fasta: str) -> IndexedDatabase:
         sage_config = SageSearchConfiguration(
             fasta=fasta,
             static_mods=static_mods,
@@ -609,11 +759,21 @@ def generate_search_configurations(
             bucket_size=bucket_size,
         )
 
-        # Generate the indexed database
-        indexed_db = sage_config.generate_indexed_database()
+        # Generate the indexed database, the GIL is released while indexing
+        return sage_config.generate_indexed_database()
 
-        # Yield the configuration with the indexed database
-        yield indexed_db
+    # Generate configurations for each split, at most num_threads splits are in flight
+    # and results are yielded in split order
+    with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+        pending = deque()
+        for fasta in fastas:
+            pending.append(executor.submit(build_indexed_database, fasta))
+            if len(pending) >= num_threads:
+                # Yield the configuration with the indexed database
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
 
 
 def compress_psms(psms: List[Psm]) -> bytes:
@@ -625,7 +785,7 @@ def compress_psms(psms: List[Psm]) -> bytes:
     Returns:
         List[Psm]: The compressed peptide spectrum matches
     """
-    return psc.py_compress_psms([psm.get_py_ptr() for psm in psms])
+    return psc.py_compress_psms(_psm_ptrs(psms))
 
 def decompress_psms(data: bytes) -> List[Psm]:
     """Decompress a list of peptide spectrum matches.
@@ -637,3 +797,27 @@ def decompress_psms(data: bytes) -> List[Psm]:
         List[Psm]: The decompressed peptide spectrum matches
     """
     return [Psm.from_py_ptr(p) for p in psc.py_decompress_psms(data)]
+
+def compress_psms_par(psms: List[Psm], num_threads: int = 4) -> bytes:
+    """Compress a list of peptide spectrum matches in parallel shards.
+
+    Args:
+        psms (List[Psm]): The peptide spectrum matches
+        num_threads (int, optional): The number of threads and shards to use. Defaults to 4.
+
+    Returns:
+        bytes: The compressed peptide spectrum matches, readable with decompress_psms_par
+    """
+    return psc.py_compress_psms_par(_psm_ptrs(psms), num_threads)
+
+def decompress_psms_par(data: bytes, num_threads: int = 4) -> List[Psm]:
+    """Decompress peptide spectrum matches written by compress_psms_par.
+
+    Args:
+        data (bytes): The compressed peptide spectrum matches
+        num_threads (int, optional): The number of threads to use. Defaults to 4.
+
+    Returns:
+        List[Psm]: The decompressed peptide spectrum matches
+    """
+    return [Psm.from_py_ptr(p) for p in psc.py_decompress_psms_par(data, num_threads)]